@@ -1,12 +1,22 @@
+import functools
 import numpy as np
-from typing import Callable, Tuple
+from typing import Callable, Optional, Tuple
 from sklearn.linear_model import Lasso
 from scipy.optimize import minimize
+from scipy.linalg import cho_factor, cho_solve
 import os
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, fall back to the NumPy objective
+    njit = None
+
 
 USE_CALL_PUT_PARITY = False
 regularization = 0.1
+# Precision of the grid and design matrix. The normal equations are always formed in
+# float64; float32 also perturbs the non-smooth weighted solve, so it is not the default
+FLOAT_DTYPE = np.float64
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,92 +28,233 @@ def ensure_dir(file_path):
     if not os.path.exists(directory):
         os.makedirs(directory)
 
-def create_basis_functions(strikes: list[float]) -> list[Callable[[float], float]]:
-    """Generate call payoff functions and spot position using put-call parity"""
-    basis = []
-    for K in strikes:
-        # Only call options needed (puts can be expressed via calls + spot)
-        basis.append(lambda S, K=K: np.maximum(S - K, 0))
-        if not USE_CALL_PUT_PARITY:
-            # Put option payoff: max(K - S, 0) 
-            basis.append(lambda S, K=K: np.maximum(K - S, 0))
-
-    return basis
+def _eval_basis(
+    S: np.ndarray,
+    strikes: list[float],
+    dtype: np.dtype = np.float64,
+    parity: Optional[bool] = None
+) -> np.ndarray:
+    """
+    Evaluate basis payoffs for all strikes at once
+    
+    For each strike the basis holds a call and the matching put. With put-call
+    parity only calls are used (puts are expressed via calls + spot) and the
+    spot position is appended as the last column.
+    
+    Args:
+        S: Spot prices at maturity
+        strikes: Available strike prices
+        dtype: Floating point type of the result
+        parity: Use put-call parity, defaults to USE_CALL_PUT_PARITY
+        
+    Returns:
+        Matrix of shape (len(S), n_basis)
+    """
+    if parity is None:
+        parity = USE_CALL_PUT_PARITY
+    S = np.asarray(S, dtype=dtype)
+    K = np.asarray(strikes, dtype=dtype)
+    diff = S[:, None] - K[None, :]
+    calls = np.clip(diff, 0.0, None)
+    if parity:
+        # Spot position column
+        return np.column_stack([calls, S])
+    
+    payoffs = np.empty((len(S), 2*len(K)), dtype=dtype)
+    payoffs[:, 0::2] = calls
+    # max(K - S, 0) = max(S - K, 0) - (S - K), written straight into the put columns
+    np.subtract(calls, diff, out=payoffs[:, 1::2])
+    return payoffs
 
-def weighted_error_objective(weights: np.ndarray, A: np.ndarray, b: np.ndarray, gamma: float) -> float:
+def weighted_error_objective(
+    weights: np.ndarray,
+    A: np.ndarray,
+    b: np.ndarray,
+    abs_b: np.ndarray,
+    gamma: float,
+    AT: Optional[np.ndarray] = None
+) -> Tuple[float, np.ndarray]:
     """
-    Compute weighted error objective function
+    Compute weighted error objective function and its subgradient
+    
+    Reference NumPy implementation. When Numba is installed the solver uses
+    the fused _weighted_error_objective_fused kernel instead, so this is
+    only the fallback path.
     
     Args:
         weights: Current solution vector
         A: Design matrix
         b: Target values
+        abs_b: Precomputed np.abs(b), used as error weights
         gamma: Regularization parameter
+        AT: Optional precomputed contiguous copy of A.T for the gradient
         
     Returns:
-        Weighted error value
+        Tuple (value, gradient) of the weighted error
     """
-    pred = A @ weights
-    error = np.abs(pred - b)
-    weighted_error = np.sum(np.abs(b) * error)
+    if AT is None:
+        AT = A.T
+    residual = A @ weights
+    residual -= b
+    weighted_error = abs_b @ np.abs(residual)
     regularization = gamma * np.sum(np.abs(weights))
-    return weighted_error + regularization
+    # Reuse the residual buffer for the weighted sign
+    np.sign(residual, out=residual)
+    residual *= abs_b
+    gradient = AT @ residual
+    gradient += gamma * np.sign(weights)
+    return weighted_error + regularization, gradient
 
-def approximate_payoff(
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _weighted_error_objective_fused(weights, A, b, abs_b, gamma):
+        """Numba version of weighted_error_objective computing value and gradient in one pass"""
+        value = 0.0
+        gradient = np.zeros(weights.shape[0])
+        for i in range(A.shape[0]):
+            residual = -b[i]
+            for j in range(A.shape[1]):
+                residual += A[i, j] * weights[j]
+            value += abs_b[i] * abs(residual)
+            if residual != 0.0:
+                scale = abs_b[i] if residual > 0.0 else -abs_b[i]
+                for j in range(A.shape[1]):
+                    gradient[j] += scale * A[i, j]
+        for j in range(weights.shape[0]):
+            value += gamma * abs(weights[j])
+            if weights[j] > 0.0:
+                gradient[j] += gamma
+            elif weights[j] < 0.0:
+                gradient[j] -= gamma
+        return value, gradient
+else:
+    _weighted_error_objective_fused = weighted_error_objective
+
+def _eval_target(target_payoff: Callable[[float], float], S: np.ndarray) -> np.ndarray:
+    """
+    Evaluate target payoff on a price grid
+    
+    The target is expected to accept an ndarray (e.g. built with np.where).
+    Scalar-only callables are still supported through np.vectorize.
+    """
+    try:
+        values = np.asarray(target_payoff(S), dtype=np.float64)
+    except (TypeError, ValueError):
+        values = None
+    if values is None or values.shape != S.shape:
+        values = np.vectorize(target_payoff, otypes=[np.float64])(S)
+    return values
+
+@functools.lru_cache(maxsize=8)
+def _price_grid(start: float, stop: float, num: int, dtype: type = np.float64) -> np.ndarray:
+    """Evenly spaced price grid, cached and returned as a read-only array"""
+    grid = np.linspace(start, stop, num, dtype=dtype)
+    grid.flags.writeable = False
+    return grid
+
+@functools.lru_cache(maxsize=8)
+def _grid_and_basis(
+    spot: float,
+    strikes: Tuple[float, ...],
+    parity: bool,
+    dtype: type
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluation grid, design matrix and Gram matrix for a spot and strike set
+    
+    These depend only on the arguments, so they are cached and shared between
+    targets and methods. Callers pass USE_CALL_PUT_PARITY and FLOAT_DTYPE
+    explicitly so that toggling them never reuses a stale matrix. All
+    returned arrays are read-only.
+    """
+    # Generate evaluation points around spot price
+    S_values = _price_grid(0.5*spot, 1.5*spot, 100, dtype)
+    
+    # Build design matrix from call/put payoffs (and spot position)
+    A = _eval_basis(S_values, strikes, dtype=dtype, parity=parity)
+    # The normal equations are too ill-conditioned for float32, form them in double precision
+    A64 = A.astype(np.float64, copy=False)
+    gram = A64.T @ A64
+    
+    A.flags.writeable = False
+    gram.flags.writeable = False
+    return S_values, A, gram
+
+def _build_system(
     target_payoff: Callable[[float], float],
     strikes: list[float],
-    spot: float,
-    regularization: float = 0.05,
-    method: str = 'l2'
-) -> Tuple[np.ndarray, float]:
+    spot: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    Approximate target payoff using vanilla options
+    Build the approximation system shared by all regularization methods
     
     Args:
-        target_payoff: Function of S (spot price) to approximate
+        target_payoff: Vectorized function of S (spot price) to approximate
         strikes: Available strike prices
         spot: Current spot price
-        regularization: Regularization parameter
-        method: Method of regularization ('l2', 'l1', or 'weighted')
         
     Returns:
-        Tuple (weights, lambda) where:
-        - weights: Coefficients for options
-        - lambda: Spot position coefficient
+        Tuple (A, b, gram, Atb) where:
+        - A: Design matrix
+        - b: Target values
+        - gram: Gram matrix A.T @ A
+        - Atb: Projected targets A.T @ b
     """
-    # Generate evaluation points around spot price
-    S_values = np.linspace(0.5*spot, 1.5*spot, 100)
+    S_values, A, gram = _grid_and_basis(spot, tuple(strikes), USE_CALL_PUT_PARITY, FLOAT_DTYPE)
+    b = _eval_target(target_payoff, S_values)
     
-    # Create basis functions (calls/puts)
-    basis = create_basis_functions(strikes)
-    
-    # Add spot position to the basis if using put-call parity
-    if USE_CALL_PUT_PARITY:
-        basis.append(lambda S: S)  # Spot position
+    return A, b, gram, A.astype(np.float64, copy=False).T @ b
+
+def _solve(
+    system: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    regularization: float,
+    method: str
+) -> Tuple[np.ndarray, float]:
+    """
+    Solve a system built by _build_system with the given regularization method
     
-    # Build design matrix
-    A = np.array([[f(S) for f in basis] for S in S_values])
-    b = np.array([target_payoff(S) for S in S_values])
+    Args:
+        system: Tuple (A, b, gram, Atb) from _build_system
+        regularization: Regularization parameter
+        method: Method of regularization ('l2', 'l1', or 'weighted')
+        
+    Returns:
+        Tuple (weights, lambda) as in approximate_payoff
+    """
+    A, b, gram, Atb = system
     
     if method == 'l2':
-        # Solve regularized least squares
-        solution = np.linalg.lstsq(
-            A.T @ A + regularization * np.eye(A.shape[1]),
-            A.T @ b,
-            rcond=None
-        )[0]
+        # Solve regularized normal equations
+        gram = gram + regularization * np.eye(A.shape[1])
+        try:
+            solution = cho_solve(cho_factor(gram), Atb)
+        except np.linalg.LinAlgError:
+            # Calls and puts are collinear (c - p = S - K), so the Gram matrix is singular
+            # and stays numerically indefinite for zero or tiny regularization
+            solution = np.linalg.lstsq(gram, Atb, rcond=None)[0]
     elif method == 'l1':
-        # L1 regularization using Lasso
-        model = Lasso(alpha=regularization, fit_intercept=False, max_iter=10000)
+        # L1 regularization using Lasso, coordinate descent on the precomputed Gram matrix
+        model = Lasso(
+            alpha=regularization,
+            fit_intercept=False,
+            precompute=gram.astype(A.dtype, copy=False),
+            max_iter=10000
+        )
         model.fit(A, b)
         solution = model.coef_
     elif method == 'weighted':
         # Weighted error optimization
         x0 = np.zeros(A.shape[1])
+        # Constant during optimization, computed once for all iterations
+        abs_b = np.abs(b)
+        args = (A, b, abs_b, regularization)
+        if njit is None:
+            args += (np.ascontiguousarray(A.T),)
         result = minimize(
-            weighted_error_objective,
+            _weighted_error_objective_fused,
             x0,
-            args=(A, b, regularization),
+            args=args,
+            jac=True,
             method='SLSQP',
             options={'maxiter': 1000}
         )
@@ -111,6 +262,9 @@ def approximate_payoff(
     else:
         raise ValueError("Invalid method. Use 'l1', 'l2', or 'weighted'")
     
+    # Callers work in double precision regardless of FLOAT_DTYPE
+    solution = np.asarray(solution, dtype=np.float64)
+    
     if USE_CALL_PUT_PARITY:
         # Split solution into options weights and lambda
         return solution[:-1], solution[-1]
@@ -118,6 +272,31 @@ def approximate_payoff(
         # Return all weights and 0 for lambda since no spot position used
         return solution, 0.0
 
+def approximate_payoff(
+    target_payoff: Callable[[float], float],
+    strikes: list[float],
+    spot: float,
+    regularization: float = 0.05,
+    method: str = 'l2'
+) -> Tuple[np.ndarray, float]:
+    """
+    Approximate target payoff using vanilla options
+    
+    Args:
+        target_payoff: Function of S (spot price) to approximate, should accept an ndarray
+        strikes: Available strike prices
+        spot: Current spot price
+        regularization: Regularization parameter
+        method: Method of regularization ('l2', 'l1', or 'weighted')
+        
+    Returns:
+        Tuple (weights, lambda) where:
+        - weights: Coefficients for options
+        - lambda: Spot position coefficient
+    """
+    system = _build_system(target_payoff, strikes, spot)
+    return _solve(system, regularization, method)
+
 def calculate_mae(y_true: np.ndarray, y_pred: np.ndarray) -> float:
     """Calculate Mean Absolute Error"""
     return np.mean(np.abs(y_true - y_pred))
@@ -130,28 +309,31 @@ def generate_comparison_table(
 ) -> None:
     """Generate performance comparison table for different regularization values"""
     # Generate evaluation points
-    S_test = np.linspace(50, 150, 500)
+    S_test = _price_grid(50, 150, 500)
     target_values = target_payoff(S_test)
+    A_test = _eval_basis(S_test, strikes)
     
     # Initialize results storage
     results = []
     
+    # The system does not depend on regularization, build it once
+    system = _build_system(target_payoff, strikes, spot)
+    
     for reg in regularization_values:
         # Calculate approximations for each method
-        weights_l2, lambda_l2 = approximate_payoff(target_payoff, strikes, spot, reg, 'l2')
-        weights_l1, lambda_l1 = approximate_payoff(target_payoff, strikes, spot, reg, 'l1')
-        weights_weighted, lambda_weighted = approximate_payoff(target_payoff, strikes, spot, reg, 'weighted')
+        weights_l2, lambda_l2 = _solve(system, reg, 'l2')
+        weights_l1, lambda_l1 = _solve(system, reg, 'l1')
+        weights_weighted, lambda_weighted = _solve(system, reg, 'weighted')
         
         # Calculate approximated values
-        basis = create_basis_functions(strikes)
-        approx_l2 = sum(w*f(S_test) for w, f in zip(weights_l2, basis))
-        approx_l1 = sum(w*f(S_test) for w, f in zip(weights_l1, basis))
-        approx_weighted = sum(w*f(S_test) for w, f in zip(weights_weighted, basis))
-        
         if USE_CALL_PUT_PARITY:
-            approx_l2 += lambda_l2*S_test
-            approx_l1 += lambda_l1*S_test
-            approx_weighted += lambda_weighted*S_test
+            approx_l2 = A_test @ np.append(weights_l2, lambda_l2)
+            approx_l1 = A_test @ np.append(weights_l1, lambda_l1)
+            approx_weighted = A_test @ np.append(weights_weighted, lambda_weighted)
+        else:
+            approx_l2 = A_test @ weights_l2
+            approx_l1 = A_test @ weights_l1
+            approx_weighted = A_test @ weights_weighted
         
         # Calculate MAE for each method
         mae_l2 = calculate_mae(target_values, approx_l2)
@@ -207,43 +389,49 @@ def example_usage():
     strikes = [70, 80, 90, 100, 105, 110, 120, 130, 98]
     
     # Run approximation with tighter regularization
-    weights_l2, lambda_l2 = approximate_payoff(target, strikes, spot=100, regularization=regularization, method='l2')
-    weights_l1, lambda_l1 = approximate_payoff(target, strikes, spot=100, regularization=regularization, method='l1')
-    weights_weighted, lambda_weighted = approximate_payoff(target, strikes, spot=100, regularization=regularization, method='weighted')
+    system = _build_system(target, strikes, spot=100)
+    weights_l2, lambda_l2 = _solve(system, regularization, 'l2')
+    weights_l1, lambda_l1 = _solve(system, regularization, 'l1')
+    weights_weighted, lambda_weighted = _solve(system, regularization, 'weighted')
     
     # Generate comparison data
-    S_test = np.linspace(50, 150, 500)
+    S_test = _price_grid(50, 150, 500)
     target_values = target(S_test)
     
     # Calculate approximated payoff
-    basis = create_basis_functions(strikes)
-    approx_l2 = sum(w*f(S_test) for w, f in zip(weights_l2, basis))
-    approx_l1 = sum(w*f(S_test) for w, f in zip(weights_l1, basis))
-    approx_weighted = sum(w*f(S_test) for w, f in zip(weights_weighted, basis))
+    A_test = _eval_basis(S_test, strikes)
     
-    # Add spot position if using put-call parity
+    # Include spot position if using put-call parity
     if USE_CALL_PUT_PARITY:
-        approx_l2 += lambda_l2*S_test
-        approx_l1 += lambda_l1*S_test
-        approx_weighted += lambda_weighted*S_test
+        approx_l2 = A_test @ np.append(weights_l2, lambda_l2)
+        approx_l1 = A_test @ np.append(weights_l1, lambda_l1)
+        approx_weighted = A_test @ np.append(weights_weighted, lambda_weighted)
+    else:
+        approx_l2 = A_test @ weights_l2
+        approx_l1 = A_test @ weights_l1
+        approx_weighted = A_test @ weights_weighted
 
     # Ensure latex directory exists
     os.makedirs(LATEX_DIR, exist_ok=True)
 
     # Save data for L1/L2 comparison
     reg_comp_dat = os.path.join(LATEX_DIR, "regularization_comparison.dat")
-    with open(reg_comp_dat, "w") as f:
-        f.write("# S target l2 l1\n")
-        for s, t, l2, l1 in zip(S_test, target_values, approx_l2, approx_l1):
-            f.write(f"{s:.6f} {t:.6f} {l2:.6f} {l1:.6f}\n")
-            
+    np.savetxt(
+        reg_comp_dat,
+        np.column_stack([S_test, target_values, approx_l2, approx_l1]),
+        fmt="%.6f",
+        header="S target l2 l1"
+    )
+    
     # Save data for weighted method comparison
     weighted_dat = os.path.join(LATEX_DIR, "weighted_loss.dat")
-    with open(weighted_dat, "w") as f:
-        f.write("# S target weighted\n")
-        for s, t, w in zip(S_test, target_values, approx_weighted):
-            f.write(f"{s:.6f} {t:.6f} {w:.6f}\n")
-            
+    np.savetxt(
+        weighted_dat,
+        np.column_stack([S_test, target_values, approx_weighted]),
+        fmt="%.6f",
+        header="S target weighted"
+    )
+    
     # Generate L1/L2 comparison plot
     reg_comp_tex = os.path.join(LATEX_DIR, "regularization_comparison.tex")
     with open(reg_comp_tex, "w") as f: